@@ -0,0 +1,49 @@
+"""
+Общая обвязка тестов: app.py читает конфиг при импорте, поэтому модуль импортируется один раз здесь.
+
+Обязательные переменные, все пуллеры и GC выключены (планировщик не стартует), данные и логи
+(относительные пути A:/git/...) — во временном каталоге. Тесты: from _app import app.
+"""
+import os
+import sys
+import tempfile
+
+for _k, _v in {
+    "JELLYFIN_BASE_URL": "http://127.0.0.1:9",
+    "JELLYFIN_API_KEY": "test-key",
+    "LANGUAGE": "en",
+    "EPISODE_PREMIERED_WITHIN_X_DAYS": "7",
+    "SEASON_ADDED_WITHIN_X_DAYS": "7",
+    "MOVIE_POLL_ENABLED": "0",
+    "SERIES_POLL_ENABLED": "0",
+    "EP_QUALITY_POLL_ENABLED": "0",
+    "ALBUM_POLL_ENABLED": "0",
+    "BOOK_POLL_ENABLED": "0",
+    "MVID_POLL_ENABLED": "0",
+    "QUALITY_GC_ENABLED": "0",
+    "RECONCILE_INTERVAL_HOURS": "0",
+    "JELLYFIN_WS_ENABLED": "0",
+}.items():
+    os.environ.setdefault(_k, _v)
+workdir = tempfile.mkdtemp(prefix="jf-notifier-test-")
+os.chdir(workdir)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402,F401
+
+
+class Patch:
+    """Подмена атрибутов app на время теста: p.set(name=value, ...); p.restore() — в tearDown."""
+
+    def __init__(self):
+        self._saved = {}
+
+    def set(self, **kw):
+        for k, v in kw.items():
+            self._saved.setdefault(k, getattr(app, k))
+            setattr(app, k, v)
+
+    def restore(self):
+        for k, v in self._saved.items():
+            setattr(app, k, v)
+        self._saved.clear()
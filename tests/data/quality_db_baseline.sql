@@ -0,0 +1,194 @@
+-- Схема media_quality.db до версионированных миграций (_init_quality_db исходного кода, без schema_version).
+-- Фикстура tests/test_quality_db_migrations.py.
+CREATE TABLE media_quality (
+            item_id TEXT PRIMARY KEY,
+            movie_name TEXT,
+            year INTEGER,
+            video_codec TEXT,
+            video_bitrate INTEGER,
+            width INTEGER,
+            height INTEGER,
+            fps REAL,
+            bit_depth INTEGER,
+            dynamic_range TEXT,
+            audio_codec TEXT,
+            audio_bitrate INTEGER,
+            audio_channels INTEGER,
+            container TEXT,
+            size_bytes INTEGER,
+            duration_sec REAL,
+            signature TEXT,
+            date_seen TEXT
+        , image_profiles TEXT);
+CREATE TABLE content_quality (
+            logical_key TEXT PRIMARY KEY,
+            last_item_id TEXT,
+            movie_name TEXT,
+            year INTEGER,
+            video_codec TEXT,
+            video_bitrate INTEGER,
+            width INTEGER,
+            height INTEGER,
+            fps REAL,
+            bit_depth INTEGER,
+            dynamic_range TEXT,
+            audio_codec TEXT,
+            audio_bitrate INTEGER,
+            audio_channels INTEGER,
+            container TEXT,
+            size_bytes INTEGER,
+            duration_sec REAL,
+            signature TEXT,
+            date_seen TEXT
+        , image_profiles TEXT);
+CREATE TABLE recent_quality_updates
+                    (
+                        logical_key
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        notified_at
+                        TEXT,
+                        item_id
+                        TEXT
+                    );
+CREATE TABLE season_progress
+                    (
+                        season_id
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        series_id
+                        TEXT,
+                        series_name
+                        TEXT,
+                        season_number
+                        INTEGER,
+                        release_year
+                        INTEGER,
+                        present
+                        INTEGER
+                        DEFAULT
+                        0, -- сколько фактически есть серий на диске
+                        total
+                        INTEGER
+                        DEFAULT
+                        0, -- сколько всего серий (present + missing)
+                        last_notified_present
+                        INTEGER
+                        DEFAULT
+                        0, -- до какого значения уже сообщали
+                        updated_at
+                        TEXT
+                    );
+CREATE TABLE external_cache
+                    (
+                        cache_key
+                        TEXT
+                        PRIMARY
+                        KEY,  -- уникальный ключ (см. ниже)
+                        kind
+                        TEXT
+                        NOT
+                        NULL, -- 'trailer' | 'ratings'
+                        subkind
+                        TEXT, -- 'movie' | 'show' (для рейтингов/трейлеров)
+                        value
+                        TEXT, -- для трейлера: URL; для рейтингов: готовый текст
+                        updated_at
+                        TEXT  -- ISO8601 UTC, когда обновляли
+                    );
+CREATE TABLE app_meta
+                    (
+                        key
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        value
+                        TEXT
+                    );
+CREATE TABLE season_quality
+                    (
+                        season_id
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        series_id
+                        TEXT,
+                        series_name
+                        TEXT,
+                        season_number
+                        INTEGER,
+                        release_year
+                        INTEGER,
+                        signature
+                        TEXT, -- агрегированный снимок качества по доступным эпизодам
+                        updated_at
+                        TEXT  -- ISO
+                    , episode_count INTEGER);
+CREATE TABLE album_announced
+                    (
+                        logical_key
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        announced_at
+                        TEXT,
+                        item_id
+                        TEXT,
+                        album_name
+                        TEXT,
+                        artist_name
+                        TEXT,
+                        year
+                        INTEGER
+                    );
+CREATE TABLE movie_announced
+                    (
+                        logical_key
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        announced_at
+                        TEXT,
+                        item_id
+                        TEXT,
+                        movie_name
+                        TEXT,
+                        year
+                        INTEGER
+                    );
+CREATE TABLE book_announced
+                    (
+                        logical_key
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        announced_at
+                        TEXT,
+                        item_id
+                        TEXT,
+                        title
+                        TEXT,
+                        authors
+                        TEXT,
+                        year
+                        INTEGER
+                    );
+CREATE TABLE musicvideo_announced
+                    (
+                        logical_key
+                        TEXT
+                        PRIMARY
+                        KEY,
+                        announced_at
+                        TEXT,
+                        item_id
+                        TEXT,
+                        title
+                        TEXT,
+                        artist
+                        TEXT,
+                        year
+                        INTEGER
+                    );
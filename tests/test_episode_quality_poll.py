@@ -0,0 +1,58 @@
+"""
+poll_episode_quality_once: season_quality.last_saved записывается только за реально сравненный снимок.
+"""
+import unittest
+
+from _app import app, Patch
+
+
+class EpisodeQualityLastSavedTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.recorded: dict[str, str] = {}
+        self.results: dict[str, object] = {}
+        self.trips = 0
+        self.checked: list[str] = []
+        self.p.set(
+            jellyfin_pass_blocked=lambda what: False,
+            jellyfin_breaker_trips=lambda: self.trips,
+            jellyfin_breaker_allows=lambda: True,
+            jellyfin_iter_pages=self._pages,
+            _sq_last_saved_map=lambda ids: {},
+            _sq_set_last_saved=lambda sid, saved: self.recorded.__setitem__(sid, saved),
+            _maybe_notify_season_quality_change=self._check,
+            _poll_window=lambda key, grace=0: (None, True),
+            _poll_window_done=lambda *a, **kw: None,
+        )
+
+    def tearDown(self):
+        self.p.restore()
+
+    def _pages(self, profile, params, **kw):
+        for sid in ("s1", "s2", "s3"):
+            yield {"Id": f"e-{sid}", "ParentId": sid, "DateCreated": "2001-01-01T00:00:00Z",
+                   "DateLastSaved": f"2024-05-0{sid[1]}T00:00:00Z"}
+
+    def _check(self, season_id):
+        self.checked.append(season_id)
+        res = self.results.get(season_id, False)
+        if res == "trip":
+            self.trips += 1
+            return None
+        return res
+
+    def test_empty_snapshot_does_not_record_last_saved(self):
+        self.results = {"s1": None, "s2": False, "s3": True}
+        app.poll_episode_quality_once()
+        self.assertEqual(self.checked, ["s1", "s2", "s3"])
+        self.assertEqual(self.recorded, {"s2": "2024-05-02T00:00:00Z", "s3": "2024-05-03T00:00:00Z"})
+
+    def test_breaker_trip_stops_recording_for_the_rest_of_the_pass(self):
+        self.results = {"s2": "trip"}
+        app.poll_episode_quality_once()
+        self.assertEqual(self.checked, ["s1", "s2", "s3"])
+        self.assertEqual(self.recorded, {"s1": "2024-05-01T00:00:00Z"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+jellyfin_iter_pages: обход с перекрытием при вставках/удалениях между страницами, обрезка на max_total
+и продолжение обрезанного листинга следующим проходом (курсор пуллера, _poll_window/_poll_window_done).
+"""
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from _app import app, Patch
+
+
+class FakeListing:
+    """Список /Items по DateCreated desc: страница — срез по StartIndex/Limit; after_page — правки между страницами."""
+
+    def __init__(self, n):
+        self.items = [f"i{k:03d}" for k in range(n)]
+        self.pages: list[tuple[int, int]] = []
+        self.after_page = None
+
+    def __call__(self, profile, q, **kw):
+        start, limit = int(q["StartIndex"]), int(q["Limit"])
+        self.pages.append((start, limit))
+        for item_id in self.items[start:start + limit]:
+            yield {"Id": item_id}
+        if self.after_page:
+            self.after_page(len(self.pages))
+
+
+class IterPagesTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.listing = FakeListing(25)
+        self.p.set(jellyfin_iter_items=self.listing, JELLYFIN_PAGE_OVERLAP=2)
+
+    def tearDown(self):
+        self.p.restore()
+
+    def _ids(self, **kw):
+        return [it["Id"] for it in app.jellyfin_iter_pages("t", {}, page_size=10, **kw)]
+
+    def assertExactlyOnce(self, got, expected):
+        self.assertEqual(len(got), len(set(got)), f"duplicates in {got}")
+        self.assertLessEqual(set(expected), set(got))
+
+    def test_stable_listing_in_order(self):
+        original = list(self.listing.items)
+        self.assertEqual(self._ids(), original)
+
+    def test_inserts_between_pages_give_no_duplicates_or_gaps(self):
+        original = list(self.listing.items)
+
+        def insert(page):
+            if page == 1:
+                self.listing.items[0:0] = ["new1", "new2", "new3"]
+        self.listing.after_page = insert
+        self.assertExactlyOnce(self._ids(), original)
+
+    def test_deletes_before_the_cursor_do_not_skip_items(self):
+        original = list(self.listing.items)
+
+        def delete(page):
+            if page == 1:
+                del self.listing.items[0:5]  # больше перекрытия (2)
+        self.listing.after_page = delete
+        got = self._ids()
+        self.assertExactlyOnce(got, original[5:])
+
+    def test_truncation_reports_resume_position(self):
+        cursor = {}
+        got = self._ids(max_total=10, cursor=cursor)
+        self.assertEqual(got, self.listing.items[:10])
+        self.assertEqual(cursor["next"], 10)
+        self.assertEqual(cursor["anchor"], ["i008", "i009"])
+        cursor = {}
+        self.assertEqual(len(self._ids(cursor=cursor)), 25)
+        self.assertIsNone(cursor["next"])
+
+    def test_resume_after_inserts_and_deletes_reads_the_rest(self):
+        original = list(self.listing.items)
+        cursor = {}
+        first = self._ids(max_total=10, cursor=cursor)
+        del self.listing.items[0:4]
+        self.listing.items[0:0] = ["new1", "new2"]
+        resumed = {"start": cursor["next"], "anchor": cursor["anchor"]}
+        second = self._ids(max_total=100, cursor=resumed)
+        self.assertIsNone(resumed["next"])
+        self.assertEqual(set(first) & set(second), set())
+        self.assertLessEqual(set(original[10:]), set(second))
+
+    def test_resume_after_list_shrank_below_the_cursor(self):
+        original = list(self.listing.items)
+        cursor = {}
+        self._ids(max_total=20, cursor=cursor)
+        del self.listing.items[0:10]  # 15 элементов, курсор на 20
+        resumed = {"start": cursor["next"], "anchor": cursor["anchor"]}
+        second = self._ids(cursor=resumed)
+        self.assertExactlyOnce(second, original[20:])
+
+
+class PollCursorTest(unittest.TestCase):
+    KEY = "test_poll_since"
+
+    def setUp(self):
+        self.p = Patch()
+        self.listing = FakeListing(25)
+        self.p.set(jellyfin_iter_items=self.listing, JELLYFIN_PAGE_OVERLAP=2, POLL_FULL_SWEEP_HOURS=0)
+        self.t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        app._meta_set(self.KEY, app._iso_utc_now_z(self.t0))
+        app._meta_set(f"{self.KEY}_resume", "")
+
+    def tearDown(self):
+        self.p.restore()
+
+    def _pass(self, now_utc, max_total):
+        since_iso, full = app._poll_window(self.KEY)
+        cursor = app._poll_cursor(self.KEY, since_iso, full)
+        got = [it["Id"] for it in app.jellyfin_iter_pages("t", {}, page_size=10, max_total=max_total, cursor=cursor)]
+        app._poll_window_done(self.KEY, now_utc, full, cursor)
+        return since_iso, got
+
+    def test_truncated_pass_keeps_watermark_until_listing_is_read(self):
+        t1, t2 = self.t0 + timedelta(hours=1), self.t0 + timedelta(hours=2)
+        since1, got1 = self._pass(t1, max_total=10)
+        self.assertEqual(len(got1), 10)
+        self.assertEqual(app._meta_get(self.KEY), app._iso_utc_now_z(self.t0))
+        self.assertEqual(app._poll_resume_get(self.KEY)["start"], 10)
+        self.listing.items[0:0] = ["edited-later"]
+        since2, got2 = self._pass(t2, max_total=100)
+        self.assertEqual(since2, since1)  # то же окно
+        self.assertLessEqual(set(self.listing.items) - {"edited-later"}, set(got1 + got2))
+        self.assertLessEqual(len(got2), 15 + app.JELLYFIN_PAGE_OVERLAP)  # повторы — только в пределах перекрытия
+        # watermark — на начало цепочки: правки за время цепочки попадут в следующее окно
+        self.assertEqual(app._meta_get(self.KEY), app._iso_utc_now_z(t1))
+        self.assertIsNone(app._poll_resume_get(self.KEY))
+
+    def test_untruncated_pass_moves_watermark(self):
+        t1 = self.t0 + timedelta(hours=1)
+        self._pass(t1, max_total=0)
+        self.assertEqual(app._meta_get(self.KEY), app._iso_utc_now_z(t1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Circuit breaker Jellyfin в режиме воспроизведения (--bench / JELLYFIN_REPLAY_FILE): пробный запрос
+half-open идёт в запись, а не в сеть.
+"""
+import unittest
+
+from _app import app, Patch
+
+
+class NoNetwork:
+    def __getattr__(self, name):
+        raise AssertionError(f"network call in replay mode: _jf_session.{name}")
+
+
+class BreakerReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.items_key = app._jf_tape_key("GET", "/emby/Items", {"api_key": "x"})
+        self.probe_key = app._jf_tape_key("GET", "/System/Info/Public", {})
+        self.tape = {self.items_key: [{"s": 503, "ct": "text/plain", "t": "down", "ms": 0}]}
+        self.p.set(_jf_tape_replay=self.tape, _jf_session=NoNetwork(), JELLYFIN_BREAKER_ENABLED=True,
+                   JELLYFIN_BREAKER_MIN_CALLS=3, JELLYFIN_BREAKER_WINDOW=3, JELLYFIN_BREAKER_FAILURE_RATE=0.5,
+                   JELLYFIN_BREAKER_OPEN_SEC=0,
+                   _jf_breaker={"state": "closed", "opened_at": 0.0, "trips": 0, "window": []})
+
+    def tearDown(self):
+        self.p.restore()
+
+    def _trip(self):
+        for _ in range(3):
+            self.assertEqual(app.jellyfin_get("/emby/Items").status_code, 503)
+        self.assertEqual(app._jf_breaker["state"], "open")
+
+    def test_probe_uses_the_tape_and_closes_on_success(self):
+        self.tape[self.probe_key] = [{"s": 200, "ct": "application/json", "t": "{}", "ms": 0}]
+        self._trip()
+        self.assertTrue(app.jellyfin_breaker_allows())
+        self.assertEqual(app._jf_breaker["state"], "closed")
+
+    def test_taped_probe_failure_keeps_breaker_open(self):
+        self.tape[self.probe_key] = [{"s": 503, "ct": "text/plain", "t": "down", "ms": 0}]
+        self._trip()
+        self.assertFalse(app.jellyfin_breaker_allows())
+        self.assertEqual(app._jf_breaker["state"], "open")
+
+    def test_unrecorded_probe_gets_synthetic_answer_without_network(self):
+        self._trip()
+        self.assertTrue(app.jellyfin_breaker_allows())  # синтетический 404 — сервер «жив»
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,256 @@
+"""
+Push-режим (JELLYFIN_WS_ENABLED): _jf_push_loop против локального фейкового WebSocket-сервера Jellyfin.
+
+Запуск из корня репозитория: python -m pytest -q tests  (или python -m unittest discover tests).
+Нужны зависимости из requirements.txt (websocket-client, Flask, ...).
+"""
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+import unittest
+
+from _app import app
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class FakeJellyfinSocket:
+    """
+    Минимальный WebSocket-сервер (RFC 6455, только текстовые кадры) вместо /socket Jellyfin.
+    Запоминает время каждого подключения и все сообщения клиента; send() — в текущее подключение.
+    """
+
+    def __init__(self):
+        self._srv = socket.create_server(("127.0.0.1", 0))
+        self.port = self._srv.getsockname()[1]
+        self.connected_at: list[float] = []
+        self.attempts_at: list[float] = []
+        self.refuse = False  # True — рвать соединение до рукопожатия (сервер «лежит»)
+        self.paths: list[str] = []
+        self.received: list[dict] = []
+        self._conn = None
+        self._cond = threading.Condition()
+        self._closed = False
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    # --- сервер
+    def _accept_loop(self):
+        while not self._closed:
+            try:
+                conn, _ = self._srv.accept()
+            except OSError:
+                return
+            with self._cond:
+                self.attempts_at.append(time.monotonic())
+                self._cond.notify_all()
+            if self.refuse:
+                conn.close()
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            request = b""
+            while b"\r\n\r\n" not in request:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                request += chunk
+            lines = request.decode("latin-1").split("\r\n")
+            headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+            accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + _WS_GUID).encode()).digest())
+            conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                         b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+            with self._cond:
+                self._conn = conn
+                self.paths.append(lines[0].split(" ")[1])
+                self.connected_at.append(time.monotonic())
+                self._cond.notify_all()
+            while True:
+                opcode, payload = self._read_frame(conn)
+                if opcode is None or opcode == 0x8:
+                    return
+                if opcode == 0x9:
+                    self._write_frame(conn, 0xA, payload)
+                elif opcode == 0x1:
+                    with self._cond:
+                        self.received.append(json.loads(payload))
+                        self._cond.notify_all()
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _recv_exact(conn, n):
+        buf = b""
+        while len(buf) < n:
+            chunk = conn.recv(n - len(buf))
+            if not chunk:
+                raise OSError("eof")
+            buf += chunk
+        return buf
+
+    def _read_frame(self, conn):
+        try:
+            b1, b2 = self._recv_exact(conn, 2)
+        except OSError:
+            return None, b""
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self._recv_exact(conn, 2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self._recv_exact(conn, 8))[0]
+        mask = self._recv_exact(conn, 4) if b2 & 0x80 else b"\0\0\0\0"
+        data = self._recv_exact(conn, length)
+        return b1 & 0x0F, bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+
+    @staticmethod
+    def _write_frame(conn, opcode, payload: bytes):
+        n = len(payload)
+        if n < 126:
+            head = struct.pack(">BB", 0x80 | opcode, n)
+        elif n < 65536:
+            head = struct.pack(">BBH", 0x80 | opcode, 126, n)
+        else:
+            head = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+        conn.sendall(head + payload)
+
+    # --- управление из теста
+    def wait_connections(self, n, timeout=10.0) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self.connected_at) >= n, timeout)
+
+    def wait_attempts(self, n, timeout=10.0) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self.attempts_at) >= n, timeout)
+
+    def wait_received(self, pred, timeout=10.0) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: any(pred(m) for m in self.received), timeout)
+
+    def send(self, msg: dict):
+        with self._cond:
+            conn = self._conn
+        self._write_frame(conn, 0x1, json.dumps(msg).encode())
+
+    def drop(self):
+        """Сервер закрывает текущее подключение (close-кадр + FIN)."""
+        with self._cond:
+            conn, self._conn = self._conn, None
+        try:
+            self._write_frame(conn, 0x8, struct.pack(">H", 1001))
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self._closed = True
+        self._srv.close()
+        if self._conn is not None:
+            self.drop()
+
+
+class JellyfinPushLoopTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeJellyfinSocket()
+        self.wakes: list[tuple] = []
+        self.forgotten: list[list] = []
+        self.lookups: list[list] = []
+        self.types: dict[str, str] = {}
+        self._saved = {k: getattr(app, k) for k in
+                       ("JELLYFIN_BASE_URL", "poll_wake", "mirror_forget", "jellyfin_get_items_by_ids")}
+        app.JELLYFIN_BASE_URL = f"http://127.0.0.1:{self.server.port}"
+        app.poll_wake = lambda *names: self.wakes.append(names)
+        app.mirror_forget = lambda ids: self.forgotten.append(list(ids))
+        app.jellyfin_get_items_by_ids = self._lookup
+        app._jf_push_stop.clear()
+        self.loop = threading.Thread(target=app._jf_push_loop, daemon=True)
+        self.loop.start()
+        self.assertTrue(self.server.wait_connections(1), "push loop did not connect")
+
+    def tearDown(self):
+        app._jf_push_stop.set()
+        self.server.close()
+        self.loop.join(10)
+        for k, v in self._saved.items():
+            setattr(app, k, v)
+        self.assertFalse(self.loop.is_alive(), "push loop did not stop")
+
+    def _lookup(self, ids, **kwargs):
+        self.lookups.append(list(ids))
+        return {i: {"Id": i, "Type": self.types[i]} for i in ids if i in self.types}
+
+    def _wait(self, pred, timeout=5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if pred():
+                return True
+            time.sleep(0.02)
+        return False
+
+    def test_connects_with_api_key_and_wakes_all_pollers(self):
+        self.assertIn("api_key=test-key", self.server.paths[0])
+        self.assertTrue(self._wait(lambda: () in self.wakes))
+        self.assertTrue(self._wait(app.jellyfin_push_active))
+
+    def test_force_keepalive_makes_client_send_keepalive(self):
+        self.server.send({"MessageType": "ForceKeepAlive", "Data": 1})
+        self.assertTrue(self.server.wait_received(lambda m: m.get("MessageType") == "KeepAlive", timeout=3))
+
+    def test_library_changed_wakes_only_mapped_jobs(self):
+        self.types = {"m1": "Movie", "e1": "Episode", "f1": "Folder"}
+        self.assertTrue(self._wait(lambda: () in self.wakes))
+        self.wakes.clear()
+        self.server.send({"MessageType": "LibraryChanged",
+                          "Data": {"ItemsAdded": ["m1"], "ItemsUpdated": ["e1", "f1"], "ItemsRemoved": []}})
+        self.assertTrue(self._wait(lambda: self.wakes))
+        self.assertEqual(self.lookups, [["m1", "e1", "f1"]])
+        self.assertEqual(len(self.wakes), 1)
+        self.assertEqual(set(self.wakes[0]), {"movie-poll", "series-poll", "ep-quality-poll"})
+
+    def test_library_changed_unknown_types_wake_nothing(self):
+        self.types = {"f1": "Folder"}
+        self.assertTrue(self._wait(lambda: () in self.wakes))
+        self.wakes.clear()
+        self.server.send({"MessageType": "LibraryChanged", "Data": {"ItemsUpdated": ["f1"]}})
+        self.assertTrue(self._wait(lambda: self.lookups))
+        time.sleep(0.2)
+        self.assertEqual(self.wakes, [])
+
+    def test_items_removed_forgets_mirror_rows(self):
+        self.server.send({"MessageType": "LibraryChanged", "Data": {"ItemsRemoved": ["gone1", "gone2"]}})
+        self.assertTrue(self._wait(lambda: ["gone1", "gone2"] in self.forgotten))
+        self.assertEqual(self.lookups, [])
+
+    def test_reconnects_with_backoff_after_server_close(self):
+        self.server.drop()
+        self.assertTrue(self._wait(lambda: not app.jellyfin_push_active()))
+        self.assertTrue(self.server.wait_connections(2, timeout=5))
+        first_gap = self.server.connected_at[1] - self.server.connected_at[0]
+        self.assertGreaterEqual(first_gap, 0.9)
+        self.assertTrue(self._wait(app.jellyfin_push_active))
+        # успешное подключение сбрасывает backoff: следующий обрыв — снова ~1 с
+        self.server.drop()
+        self.assertTrue(self.server.wait_connections(3, timeout=5))
+        second_gap = self.server.connected_at[2] - self.server.connected_at[1]
+        self.assertGreaterEqual(second_gap, 0.9)
+        self.assertLess(second_gap, 1.9)
+
+    def test_backoff_grows_while_server_is_down(self):
+        self.server.refuse = True
+        self.server.drop()
+        self.assertTrue(self.server.wait_attempts(3, timeout=8))  # обрыв -> 1 с -> отказ -> 2 с -> отказ
+        self.server.refuse = False
+        self.assertTrue(self.server.wait_connections(2, timeout=8))  # -> 4 с -> подключились
+        a = self.server.attempts_at
+        self.assertGreaterEqual(a[2] - a[1], 1.9)
+        self.assertGreaterEqual(a[3] - a[2], 3.9)
+        self.assertTrue(self._wait(app.jellyfin_push_active))
+
+if __name__ == "__main__":
+    unittest.main()
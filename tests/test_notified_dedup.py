@@ -0,0 +1,106 @@
+"""
+Дедуп уведомлений: таблица notified_items с TTL, LRU перед ней, импорт старого notified_items.json.
+"""
+import json
+import os
+import sqlite3
+import unittest
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from _app import app, Patch, workdir
+
+
+def _db_row(path, item_type, item_key):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT notified_at, expires_at FROM notified_items WHERE item_type=? AND item_key=?",
+                            (item_type, item_key)).fetchone()
+    finally:
+        conn.close()
+
+
+class NotifiedDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.p.set(_notified_lru=OrderedDict(), DISABLE_DEDUP=False, NOTIFIED_TTL_DAYS=180, NOTIFIED_LRU_SIZE=4096)
+
+    def tearDown(self):
+        self.p.restore()
+
+    def test_mark_survives_restart(self):
+        app.mark_item_as_notified("Movie", "Persisted", 2020)
+        self.assertTrue(app.item_already_notified("Movie", "Persisted", 2020))
+        app._notified_lru.clear()  # «рестарт»: кэша нет, ответ — из таблицы
+        self.assertTrue(app.item_already_notified("Movie", "Persisted", 2020))
+        self.assertIsNotNone(_db_row(app.QUALITY_DB_FILE, "Movie", "Persisted:2020"))
+
+    def test_expired_entry_is_not_notified(self):
+        self.p.set(NOTIFIED_TTL_DAYS=-1)
+        app.mark_item_as_notified("Movie", "Expired", 2019)
+        self.assertFalse(app.item_already_notified("Movie", "Expired", 2019))  # из LRU
+        app._notified_lru.clear()
+        self.assertFalse(app.item_already_notified("Movie", "Expired", 2019))  # из таблицы
+
+    def test_negative_answer_is_cached(self):
+        self.assertFalse(app.item_already_notified("Series", "Unseen", 2021))
+        self.assertEqual(app._notified_lru[("Series", "Unseen:2021")], "")
+        # запись в обход процесса: LRU её не видит — повторный вопрос в БД не ходит
+        conn = sqlite3.connect(app.QUALITY_DB_FILE)
+        conn.execute("INSERT INTO notified_items VALUES ('Series', 'Unseen:2021', '2026-01-01T00:00:00Z', "
+                     "'2999-01-01T00:00:00Z')")
+        conn.commit()
+        conn.close()
+        self.assertFalse(app.item_already_notified("Series", "Unseen", 2021))
+        # а отметка этого процесса обновляет кэш сразу
+        app.mark_item_as_notified("Series", "Unseen", 2021)
+        self.assertTrue(app.item_already_notified("Series", "Unseen", 2021))
+
+    def test_lru_is_bounded(self):
+        self.p.set(NOTIFIED_LRU_SIZE=2)
+        for name in ("A", "B", "C"):
+            app.item_already_notified("Movie", name, 2000)
+        self.assertEqual(list(app._notified_lru), [("Movie", "B:2000"), ("Movie", "C:2000")])
+
+
+class LegacyJsonImportTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.dir = os.path.join(workdir, "legacy-json")
+        os.makedirs(self.dir, exist_ok=True)
+        self.json_path = os.path.join(self.dir, "notified_items.json")
+        self.db_path = os.path.join(self.dir, "media_quality.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump({"Movie:Dune:2021": True, "Series:Show: Part 2:2020": True,
+                       "Movie:Dropped:2000": False, "no-colon": True}, f)
+        self.p.set(notified_items_file=self.json_path, QUALITY_DB_FILE=self.db_path, NOTIFIED_TTL_DAYS=30)
+
+    def tearDown(self):
+        self.p.restore()
+
+    def test_legacy_keys_are_imported_with_ttl(self):
+        app._init_quality_db()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute("SELECT item_type, item_key, notified_at, expires_at FROM notified_items "
+                                "ORDER BY item_type").fetchall()
+        finally:
+            conn.close()
+        self.assertEqual([(t, k) for t, k, _, _ in rows], [("Movie", "Dune:2021"), ("Series", "Show: Part 2:2020")])
+        for _, _, notified_at, expires_at in rows:
+            self.assertGreater(expires_at, notified_at)
+            self.assertGreater(expires_at, app._iso_utc_now_z(datetime.now(timezone.utc) + timedelta(days=29)))
+
+    def test_import_runs_once(self):
+        app._init_quality_db()
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump({"Movie:Later:2022": True}, f)
+        app._init_quality_db()
+        self.assertIsNone(_db_row(self.db_path, "Movie", "Later:2022"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Версионированные миграции media_quality.db (_QUALITY_DB_MIGRATIONS / _init_quality_db).
+"""
+import os
+import sqlite3
+import unittest
+
+from _app import app, Patch, workdir
+
+BASELINE_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "quality_db_baseline.sql")
+
+
+def _schema(path):
+    """{таблица: {(колонка, тип)}} и имена явных индексов — порядок колонок у ALTER и CREATE разный."""
+    conn = sqlite3.connect(path)
+    try:
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' "
+                                             "AND name NOT LIKE 'sqlite_%'")]
+        cols = {t: {(r[1], r[2]) for r in conn.execute(f"PRAGMA table_info({t})")} for t in tables}
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index' "
+                                              "AND name NOT LIKE 'sqlite_autoindex_%'")}
+        return cols, indexes
+    finally:
+        conn.close()
+
+
+def _version(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT version FROM schema_version WHERE id=1").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class QualityDbMigrationsTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.dir = os.path.join(workdir, "migrations")
+        os.makedirs(self.dir, exist_ok=True)
+        self.p.set(notified_items_file=os.path.join(self.dir, "no-such-notified_items.json"))
+
+    def tearDown(self):
+        self.p.restore()
+
+    def _db(self, name, sql=None):
+        path = os.path.join(self.dir, name)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        if sql:
+            conn = sqlite3.connect(path)
+            conn.executescript(sql)
+            conn.close()
+        return path
+
+    def _init(self, path):
+        self.p.set(QUALITY_DB_FILE=path)
+        app._init_quality_db()
+
+    def test_baseline_database_is_upgraded_through_all_steps(self):
+        with open(BASELINE_SQL, encoding="utf-8") as f:
+            legacy = self._db("legacy.db", f.read())
+        conn = sqlite3.connect(legacy)
+        conn.execute("INSERT INTO season_quality(season_id, signature, episode_count) VALUES ('s1', 'sig', 8)")
+        conn.execute("INSERT INTO movie_announced(logical_key, item_id) VALUES ('tmdb:1', 'm1')")
+        conn.commit()
+        conn.close()
+
+        with self.assertLogs(level="INFO") as logs:
+            self._init(legacy)
+        target = app._QUALITY_DB_MIGRATIONS[-1][0]
+        self.assertEqual(_version(legacy), target)
+        self.assertTrue(any("schema migrated" in line for line in logs.output))
+
+        fresh = self._db("fresh.db")
+        self._init(fresh)
+        self.assertEqual(_schema(legacy), _schema(fresh))
+
+        conn = sqlite3.connect(legacy)
+        try:
+            self.assertEqual(conn.execute("SELECT signature, episode_count, last_saved FROM season_quality "
+                                          "WHERE season_id='s1'").fetchone(), ("sig", 8, None))
+            self.assertEqual(conn.execute("SELECT item_id FROM movie_announced").fetchall(), [("m1",)])
+        finally:
+            conn.close()
+
+    def test_current_schema_is_skipped(self):
+        path = self._db("current.db")
+        self._init(path)
+
+        def fail(cur):
+            raise AssertionError("migration step ran on a current schema")
+        self.p.set(_QUALITY_DB_MIGRATIONS=[(v, title, fail) for v, title, _ in app._QUALITY_DB_MIGRATIONS])
+        self._init(path)
+        self.assertEqual(_version(path), app._QUALITY_DB_MIGRATIONS[-1][0])
+
+    def test_only_missing_steps_run(self):
+        path = self._db("partial.db")
+        self._init(path)
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE schema_version SET version=4 WHERE id=1")
+        conn.commit()
+        conn.close()
+
+        ran = []
+
+        def record(version, step):
+            def run(cur):
+                ran.append(version)
+                step(cur)
+            return run
+        self.p.set(_QUALITY_DB_MIGRATIONS=[(v, title, record(v, step)) for v, title, step in app._QUALITY_DB_MIGRATIONS])
+        self._init(path)
+        self.assertEqual(ran, [5, 6])
+        self.assertEqual(_version(path), 6)
+
+    def test_failed_step_is_rolled_back_and_retried(self):
+        path = self._db("broken.db")
+        steps = list(app._QUALITY_DB_MIGRATIONS)
+
+        def broken(cur):
+            cur.execute("CREATE TABLE half_done (x)")
+            raise RuntimeError("step failed")
+        self.p.set(_QUALITY_DB_MIGRATIONS=steps[:-1] + [(steps[-1][0], steps[-1][1], broken)])
+        with self.assertRaises(RuntimeError):
+            self._init(path)
+        self.assertEqual(_version(path), steps[-2][0])
+        self.p.set(_QUALITY_DB_MIGRATIONS=steps)
+        self._init(path)
+        self.assertEqual(_version(path), steps[-1][0])
+        self.assertNotIn("half_done", _schema(path)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+GC базы качества: quality_db_reclaim возвращает место только через incremental_vacuum.
+"""
+import os
+import sqlite3
+import unittest
+
+from _app import app, Patch
+
+
+class QualityDbReclaimTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.p.set(QUALITY_GC_VACUUM_PAGES=100)
+        self.statements: list[str] = []
+
+    def tearDown(self):
+        self.p.restore()
+
+    def _db(self, name, *, incremental):
+        path = os.path.join(os.path.dirname(os.path.abspath(app.QUALITY_DB_FILE)), name)
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path, isolation_level=None)
+        if incremental:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("CREATE TABLE t (v TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [("x" * 2000,)] * 200)
+        conn.execute("DELETE FROM t")
+        conn.isolation_level = ""
+        conn.set_trace_callback(self.statements.append)
+        return conn
+
+    def test_incremental_database_gets_pages_back(self):
+        conn = self._db("incr.db", incremental=True)
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        self.assertGreater(free, 0)
+        app.quality_db_reclaim(conn)
+        self.assertLess(conn.execute("PRAGMA freelist_count").fetchone()[0], free)
+        self.assertNotIn("VACUUM", self.statements)
+
+    def test_legacy_database_is_not_vacuumed_by_gc(self):
+        conn = self._db("legacy.db", incremental=False)
+        app.quality_db_reclaim(conn)
+        self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 0)
+        self.assertNotIn("VACUUM", self.statements)
+
+    def test_open_transaction_skips_reclaim(self):
+        conn = self._db("busy.db", incremental=True)
+        conn.execute("INSERT INTO t VALUES ('pending')")
+        self.assertTrue(conn.in_transaction)
+        self.statements.clear()
+        app.quality_db_reclaim(conn)
+        self.assertTrue(conn.in_transaction)
+        self.assertEqual(self.statements, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
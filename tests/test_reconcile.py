@@ -0,0 +1,127 @@
+"""
+Сверка библиотеки по бакетам (reconcile_library_once): хэш бакета, поиск разошедшихся бакетов,
+откат watermark'ов пуллеров к пропущенной версии.
+"""
+import sqlite3
+import unittest
+
+from _app import app, Patch
+
+WATERMARK = "2026-03-01T00:00:00Z"
+
+
+class ReconcileDigestTest(unittest.TestCase):
+    ROWS = [("a1", "2026-01-01T00:00:00Z"), ("a2", "2026-01-02T00:00:00Z"), ("a3", None)]
+
+    def test_digest_does_not_depend_on_listing_order(self):
+        self.assertEqual(app._reconcile_digest(self.ROWS), app._reconcile_digest(list(reversed(self.ROWS))))
+
+    def test_digest_normalizes_ids(self):
+        self.assertEqual(app._reconcile_digest([("AB-CD", None)]), app._reconcile_digest([("abcd", None)]))
+
+    def test_digest_changes_with_version_and_membership(self):
+        base = app._reconcile_digest(self.ROWS)
+        self.assertNotEqual(base, app._reconcile_digest([self.ROWS[0], self.ROWS[1], ("a3", "2026-02-01T00:00:00Z")]))
+        self.assertNotEqual(base, app._reconcile_digest(self.ROWS[:2]))
+        self.assertTrue(base.startswith("3:"))
+
+
+class ReconcileLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.listing: dict[str, list[dict]] = {
+            "Movie": [{"Id": "a1", "DateLastSaved": "2026-01-01T00:00:00Z"},
+                      {"Id": "a2", "DateLastSaved": "2026-01-02T00:00:00Z"},
+                      {"Id": "b1", "DateLastSaved": "2026-01-03T00:00:00Z"},
+                      {"Id": "c1", "DateLastSaved": "2026-01-04T00:00:00Z"}],
+            "Episode": [{"Id": "d1", "DateLastSaved": "2026-01-05T00:00:00Z"}],
+        }
+        self.wakes: list[tuple] = []
+        self.looked_up: list[str] = []
+        real_get_many = app.mirror_get_many
+
+        def get_many(ids):
+            ids = list(ids)
+            self.looked_up.extend(ids)
+            return real_get_many(ids)
+        self.p.set(RECONCILE_TYPES=["Movie", "Episode"], RECONCILE_BUCKET_PREFIX=1, ITEM_MIRROR_ENABLED=True,
+                   jellyfin_pass_blocked=lambda what: False, jellyfin_iter_pages=self._pages,
+                   poll_wake=lambda *jobs: self.wakes.append(jobs), mirror_get_many=get_many)
+        conn = sqlite3.connect(app.QUALITY_DB_FILE)
+        conn.execute("DELETE FROM reconcile_bucket")
+        conn.execute("DELETE FROM item_mirror")
+        conn.commit()
+        conn.close()
+        for key in ("movie_poll_since", "series_poll_since", "epq_poll_since"):
+            app._meta_set(key, WATERMARK)
+
+    def tearDown(self):
+        self.p.restore()
+
+    def _pages(self, profile, params, **kw):
+        yield from (dict(it) for it in self.listing[params["IncludeItemTypes"]])
+
+    def _set(self, item_type, item_id, saved):
+        for it in self.listing[item_type]:
+            if it["Id"] == item_id:
+                it["DateLastSaved"] = saved
+
+    def _buckets(self, item_type):
+        conn = sqlite3.connect(app.QUALITY_DB_FILE)
+        try:
+            return dict(conn.execute("SELECT bucket, digest FROM reconcile_bucket WHERE item_type=?", (item_type,)))
+        finally:
+            conn.close()
+
+    def test_first_pass_stores_baseline_without_rewind(self):
+        app.reconcile_library_once()
+        self.assertEqual(set(self._buckets("Movie")), {"a", "b", "c"})
+        self.assertEqual(self.looked_up, [])
+        self.assertEqual(self.wakes, [])
+        self.assertEqual(app._meta_get("movie_poll_since"), WATERMARK)
+
+    def test_unchanged_library_checks_no_items(self):
+        app.reconcile_library_once()
+        app.reconcile_library_once()
+        self.assertEqual(self.looked_up, [])
+        self.assertEqual(app._meta_get("movie_poll_since"), WATERMARK)
+
+    def test_missed_change_rewinds_only_its_type(self):
+        app.reconcile_library_once()
+        # a2 поменялся, а пуллер его не видел (в зеркале старая версия)
+        self._set("Movie", "a2", "2026-02-10T12:00:00Z")
+        # b1 поменялся и пуллер его видел — зеркало уже с новой версией
+        self._set("Movie", "b1", "2026-02-01T00:00:00Z")
+        app.mirror_upsert([{"Id": "b1", "Type": "Movie", "DateLastSaved": "2026-02-01T00:00:00Z"}])
+        app.reconcile_library_once()
+        # поэлементно — только разошедшиеся бакеты a и b
+        self.assertEqual(sorted(self.looked_up), ["a1", "a2", "b1"])
+        self.assertEqual(app._meta_get("movie_poll_since"), "2026-02-10T11:59:00Z")
+        self.assertEqual(app._meta_get("series_poll_since"), WATERMARK)
+        self.assertEqual(self.wakes, [("movie-poll",)])
+        # хэши обновлены: следующий проход ничего не находит
+        self.looked_up.clear()
+        app.reconcile_library_once()
+        self.assertEqual(self.looked_up, [])
+
+    def test_new_item_rewinds_every_watermark_of_the_type(self):
+        app.reconcile_library_once()
+        self.listing["Episode"].append({"Id": "e9", "DateLastSaved": "2026-02-20T00:00:00Z"})
+        app.reconcile_library_once()
+        self.assertEqual(sorted(self.looked_up), ["e9"])
+        self.assertEqual(app._meta_get("series_poll_since"), "2026-02-19T23:59:00Z")
+        self.assertEqual(app._meta_get("epq_poll_since"), "2026-02-19T23:59:00Z")
+        self.assertEqual(app._meta_get("movie_poll_since"), WATERMARK)
+        self.assertEqual(self.wakes, [("series-poll", "ep-quality-poll")])
+
+    def test_watermark_older_than_missed_version_is_kept(self):
+        app.reconcile_library_once()
+        self._set("Movie", "c1", "2026-04-01T00:00:00Z")  # позже watermark'а — следующее окно его и так возьмёт
+        app.reconcile_library_once()
+        self.assertEqual(self.looked_up, ["c1"])
+        self.assertEqual(app._meta_get("movie_poll_since"), WATERMARK)
+        self.assertEqual(self.wakes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Отложенная запись (DB_WRITE_BEHIND): точки сохранения хелперов, flush перед отправкой уведомления,
+откат прохода, если финальный flush не прошёл.
+"""
+import sqlite3
+import threading
+import unittest
+
+from _app import app, Patch
+
+
+def _in_thread(fn):
+    """Соединение quality_db() — своё у каждого потока: каждый тест работает на свежем."""
+    box = {}
+
+    def run():
+        try:
+            box["result"] = fn()
+        except BaseException as ex:  # noqa: B902 — пробрасываем в поток теста
+            box["error"] = ex
+    t = threading.Thread(target=run)
+    t.start()
+    t.join(30)
+    if "error" in box:
+        raise box["error"]
+    return box.get("result")
+
+
+def _meta_on_disk(key):
+    """Что видит другое соединение (вебхук, другой пуллер)."""
+    conn = sqlite3.connect(app.QUALITY_DB_FILE)
+    try:
+        row = conn.execute("SELECT value FROM app_meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def _failing_helper(key):
+    """Хелпер, упавший между записью и commit()."""
+    try:
+        conn = app.quality_db()
+        conn.execute("INSERT INTO app_meta(key, value) VALUES (?, 'x')", (key,))
+        raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    finally:
+        app.quality_db_release(conn)
+
+
+class WriteBehindTest(unittest.TestCase):
+    def setUp(self):
+        self.p = Patch()
+        self.p.set(DB_WRITE_BEHIND=True, DB_WRITE_BEHIND_MAX_WRITES=1000, DB_WRITE_BEHIND_MAX_HOLD_MS=60000)
+
+    def tearDown(self):
+        self.p.restore()
+
+    def test_writes_are_deferred_until_batch_end(self):
+        def run():
+            app.quality_db_batch_begin()
+            app._meta_set("wb_deferred", "1")
+            before = _meta_on_disk("wb_deferred")
+            app.quality_db_batch_end()
+            return before
+        self.assertIsNone(_in_thread(run))
+        self.assertEqual(_meta_on_disk("wb_deferred"), "1")
+
+    def test_failed_helper_rolls_back_only_its_own_savepoint(self):
+        def run():
+            app.quality_db_batch_begin()
+            app._meta_set("wb_kept_before", "1")
+            _failing_helper("wb_failed")
+            app._meta_set("wb_kept_after", "1")
+            own_view = app._meta_get("wb_failed")
+            app.quality_db_batch_end()
+            return own_view
+        self.assertIsNone(_in_thread(run))
+        self.assertEqual(_meta_on_disk("wb_kept_before"), "1")
+        self.assertEqual(_meta_on_disk("wb_kept_after"), "1")
+        self.assertIsNone(_meta_on_disk("wb_failed"))
+
+    def test_failed_helper_first_in_batch_rolls_back(self):
+        def run():
+            app.quality_db_batch_begin()
+            _failing_helper("wb_failed_first")
+            app._meta_set("wb_after_first", "1")
+            app.quality_db_batch_end()
+        _in_thread(run)
+        self.assertIsNone(_meta_on_disk("wb_failed_first"))
+        self.assertEqual(_meta_on_disk("wb_after_first"), "1")
+
+    def test_pending_writes_are_flushed_before_send_notification(self):
+        class Sent(Exception):
+            pass
+        seen = {}
+
+        def upload(photo_id):
+            seen["on_disk"] = _meta_on_disk("wb_announced")
+            raise Sent()
+        self.p.set(POLL_BENCH_MODE=False, get_jellyfin_image_and_upload_imgbb=upload)
+
+        def run():
+            app.quality_db_batch_begin()
+            try:
+                app._meta_set("wb_announced", "1")
+                with self.assertRaises(Sent):
+                    app.send_notification("item", "caption")
+            finally:
+                app.quality_db_batch_end()
+        _in_thread(run)
+        self.assertEqual(seen["on_disk"], "1")
+
+    def test_batch_end_rolls_back_when_final_flush_fails(self):
+        setup = sqlite3.connect(app.QUALITY_DB_FILE)
+        setup.executescript("""
+            CREATE TABLE IF NOT EXISTS wb_parent (id INTEGER PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS wb_child (
+                parent_id INTEGER REFERENCES wb_parent(id) DEFERRABLE INITIALLY DEFERRED);
+        """)
+        setup.close()
+
+        def run():
+            conn = app.quality_db()
+            conn.execute("PRAGMA foreign_keys=ON")  # отложенный FK валит именно COMMIT
+            app.quality_db_release(conn)
+            app.quality_db_batch_begin()
+            app._meta_set("wb_lost", "1")
+            conn = app.quality_db()
+            try:
+                conn.execute("INSERT INTO wb_child(parent_id) VALUES (42)")
+                conn.commit()
+            finally:
+                app.quality_db_release(conn)
+            with self.assertLogs(level="ERROR") as logs:
+                app.quality_db_batch_end()
+            conn = app.quality_db()
+            try:
+                return conn.in_transaction, logs.output
+            finally:
+                app.quality_db_release(conn)
+        in_txn, output = _in_thread(run)
+        self.assertFalse(in_txn)
+        self.assertTrue(any("rolled back" in line for line in output))
+        self.assertIsNone(_meta_on_disk("wb_lost"))
+        conn = sqlite3.connect(app.QUALITY_DB_FILE)
+        try:
+            self.assertEqual(conn.execute("SELECT count(*) FROM wb_child").fetchone()[0], 0)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()